@@ -4,21 +4,38 @@ Generate charts from C++ order book analysis results
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+from pathlib import Path
+
+def load_impact(symbol, side):
+    """Load an impact table, preferring its typed Parquet copy when it is up to date"""
+    csv_path = Path(f'{symbol}_{side}_impact.csv')
+    parquet_path = csv_path.with_suffix('.parquet')
+    if parquet_path.exists() and (not csv_path.exists()
+                                  or parquet_path.stat().st_mtime >= csv_path.stat().st_mtime):
+        return pd.read_parquet(parquet_path, engine='pyarrow')
+    return pd.read_csv(csv_path)
 
 def create_cpp_charts():
     """Create charts from C++ generated CSV files"""
     
     symbols = ['CRWV', 'FROG', 'SOUN']
     
-    # Create figure with subplots
-    fig, axes = plt.subplots(2, 3, figsize=(18, 12))
+    # Load impact tables once for both charts
+    loaded = {}
+    for symbol in symbols:
+        try:
+            loaded[symbol] = (load_impact(symbol, 'buy'), load_impact(symbol, 'sell'))
+        except FileNotFoundError:
+            continue
+    
+    # Create one figure, reused for the comparison chart below
+    fig = plt.figure(figsize=(18, 12))
+    axes = fig.subplots(2, 3)
     fig.suptitle('Temporary Price Impact Analysis (C++ Results)', fontsize=16, fontweight='bold')
     
     for i, symbol in enumerate(symbols):
-        try:
-            # Load C++ generated CSV files
-            buy_impact = pd.read_csv(f'{symbol}_buy_impact.csv')
-            sell_impact = pd.read_csv(f'{symbol}_sell_impact.csv')
+        if symbol in loaded:
+            buy_impact, sell_impact = loaded[symbol]
             
             # Plot buy side impact
             axes[0, i].plot(buy_impact['order_size'], buy_impact['impact_bps'], 
@@ -56,44 +73,47 @@ def create_cpp_charts():
                            bbox=dict(boxstyle='round', facecolor='lightcoral', alpha=0.7),
                            verticalalignment='top')
             
-        except FileNotFoundError:
+        else:
             axes[0, i].text(0.5, 0.5, f'No data for {symbol}', 
                            transform=axes[0, i].transAxes, ha='center', va='center')
             axes[1, i].text(0.5, 0.5, f'No data for {symbol}', 
                            transform=axes[1, i].transAxes, ha='center', va='center')
     
-    plt.tight_layout()
-    plt.savefig('cpp_price_impact_analysis.png', dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig('cpp_price_impact_analysis.png', dpi=300, bbox_inches='tight')
     print("✅ Chart saved as 'cpp_price_impact_analysis.png'")
     
     # Also create a comparison chart
-    create_comparison_chart(symbols)
+    create_comparison_chart(symbols, loaded, fig)
+    plt.close(fig)
 
-def create_comparison_chart(symbols):
+def create_comparison_chart(symbols, loaded, fig=None):
     """Create a comparison chart showing all symbols together"""
     
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
+    if fig is None:
+        fig = plt.figure(figsize=(16, 8))
+    else:
+        fig.clear()
+        fig.set_size_inches(16, 8)
+    ax1, ax2 = fig.subplots(1, 2)
     fig.suptitle('Price Impact Comparison Across Symbols (C++ Results)', fontsize=16, fontweight='bold')
     
     colors = ['blue', 'green', 'orange']
     
     for i, symbol in enumerate(symbols):
-        try:
-            buy_impact = pd.read_csv(f'{symbol}_buy_impact.csv')
-            sell_impact = pd.read_csv(f'{symbol}_sell_impact.csv')
-            
-            # Buy side comparison
-            ax1.plot(buy_impact['order_size'], buy_impact['impact_bps'], 
-                    color=colors[i], linewidth=2, marker='o', markersize=3,
-                    label=f'{symbol}')
-            
-            # Sell side comparison  
-            ax2.plot(sell_impact['order_size'], sell_impact['impact_bps'],
-                    color=colors[i], linewidth=2, marker='s', markersize=3,
-                    label=f'{symbol}')
-            
-        except FileNotFoundError:
+        if symbol not in loaded:
             continue
+        buy_impact, sell_impact = loaded[symbol]
+        
+        # Buy side comparison
+        ax1.plot(buy_impact['order_size'], buy_impact['impact_bps'], 
+                color=colors[i], linewidth=2, marker='o', markersize=3,
+                label=f'{symbol}')
+        
+        # Sell side comparison  
+        ax2.plot(sell_impact['order_size'], sell_impact['impact_bps'],
+                color=colors[i], linewidth=2, marker='s', markersize=3,
+                label=f'{symbol}')
     
     ax1.set_title('Buy Side Impact Comparison', fontweight='bold')
     ax1.set_xlabel('Order Size (Shares)')
@@ -107,8 +127,8 @@ def create_comparison_chart(symbols):
     ax2.grid(True, alpha=0.3)
     ax2.legend()
     
-    plt.tight_layout()
-    plt.savefig('cpp_impact_comparison.png', dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig('cpp_impact_comparison.png', dpi=300, bbox_inches='tight')
     print("✅ Comparison chart saved as 'cpp_impact_comparison.png'")
 
 if __name__ == "__main__":